@@ -56,9 +56,10 @@ def run_tests(test_type="all", coverage=False, verbose=False, parallel=False):
     if verbose:
         cmd.append("-v")
     
-    # Add parallel execution
+    # Add parallel execution; keep each file on one worker so module and
+    # session fixtures are built once per worker rather than once per test
     if parallel:
-        cmd.extend(["-n", "auto"])
+        cmd.extend(["-n", "auto", "--dist", "loadfile"])
     
     # Add additional pytest options
     cmd.extend([
@@ -0,0 +1,17 @@
+"""
+JSON helpers shared by the A2A test modules.
+
+Bodies are encoded with orjson when it is installed and with the stdlib
+json module otherwise; both return str like json.dumps.
+"""
+
+try:
+    import orjson
+
+    def dumps(obj) -> str:
+        """Serialize with orjson, returning str as API Gateway delivers request bodies."""
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+except ImportError:
+    from json import dumps, loads
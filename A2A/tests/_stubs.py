@@ -0,0 +1,15 @@
+"""
+Test doubles shared by the A2A discovery test modules.
+"""
+
+from unittest.mock import Mock
+
+
+class StubDiscoveryService:
+    """Plain stand-in for DiscoveryService with one Mock per method the handler routes to."""
+    
+    def __init__(self):
+        self.get_agents = Mock()
+        self.register_agent = Mock()
+        self.ai_discovery = Mock()
+        self.get_recommendations = Mock()
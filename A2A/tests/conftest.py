@@ -315,6 +315,9 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "slow: mark test as slow running"
     )
+    config.addinivalue_line(
+        "markers", "benchmark: mark test as a pytest-benchmark micro-benchmark"
+    )
 
 
 def pytest_collection_modifyitems(config, items):
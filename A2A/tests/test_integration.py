@@ -4,8 +4,9 @@ Integration tests for the A2A Agent Discovery System.
 
 import pytest
 import asyncio
-import json
-from unittest.mock import Mock, patch, AsyncMock
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from unittest.mock import create_autospec
 
 from protocol import (
     AgentCard, Capability, CapabilityType, Task, TaskStatus,
@@ -13,6 +14,116 @@ from protocol import (
 )
 from registry import AgentRegistry
 from agents.base_agent import BaseAgent
+from discovery.discovery_api import lambda_handler as discovery_api_handler
+from tests._json import dumps, loads
+
+# Run every async test in this module on one session-wide event loop
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+# Constant API request bodies, serialized once at import
+_API_AGENT_DATA_JSON = dumps({
+    'name': 'API Test Agent',
+    'description': 'Agent created via API',
+    'capabilities': [
+        {
+            'type': 'text_processing',
+            'name': 'Text Processing',
+            'description': 'Processes text'
+        }
+    ],
+    'contact_info': {'email': 'api@test.com'},
+    'location': 'us-east-1'
+})
+
+# (event, key expected in the response body) per API endpoint
+_API_ENDPOINT_CASES = [
+    pytest.param(
+        {
+            'httpMethod': 'GET',
+            'path': '/agents',
+            'queryStringParameters': {
+                'capabilities': 'text_processing,data_analysis',
+                'location': 'us-east-1',
+                'limit': '3'
+            }
+        },
+        'request_id',
+        id='get_agents',
+    ),
+    pytest.param(
+        {
+            'httpMethod': 'POST',
+            'path': '/agents',
+            'body': _API_AGENT_DATA_JSON
+        },
+        'agent_id',
+        id='post_agents',
+    ),
+]
+
+_OVERSIZED_AGENT_JSON = dumps({
+    'name': 'A' * 10000,  # Very long name
+    'description': 'A' * 50000,  # Very long description
+    'capabilities': []
+})
+
+# Registry results shared by the flow tests; callers fill in per-agent fields
+_REG_OK = {
+    'success': True,
+    'agent_id': None,
+    'message': 'Agent registered successfully'
+}
+_DISCOVERY_OK = {
+    'success': True,
+    'agents': [],
+    'total_found': 1,
+    'scanned_count': 1
+}
+
+
+@pytest.fixture(scope="session")
+def text_capability():
+    """Validated once; models are only read, so tests can share it."""
+    return Capability(
+        type=CapabilityType.TEXT_PROCESSING,
+        name="Text Processing",
+        description="Processes text content"
+    )
+
+
+@pytest.fixture(scope="session")
+def _registry_spec():
+    """Autospec AgentRegistry once; introspecting the class per test is wasted work."""
+    return create_autospec(AgentRegistry, spec_set=True, instance=True)
+
+
+@pytest.fixture
+def registry_mock(_registry_spec):
+    """Shared registry mock, reset after each test."""
+    yield _registry_spec
+    _registry_spec.reset_mock(return_value=True, side_effect=True)
+
+
+# Scan pages for the bulk discovery test, built once per page size.
+# discover_agents sorts 'Items' in place by last_seen; these items have none,
+# so the stable sort leaves them as built and sharing them is safe.
+_BULK_PAGE_SIZES = (10, 100, 1000)
+_BULK_SCAN_RESPONSES = {
+    per_page: {
+        'Items': [
+            {
+                'agent_id': f'agent-{i}',
+                'name': f'Agent {i}',
+                'capability_types': ['text_processing', 'data_analysis'],
+                'status': 'active'
+            }
+            for i in range(per_page)
+        ],
+        'ScannedCount': per_page,
+        'Count': per_page
+    }
+    for per_page in _BULK_PAGE_SIZES
+}
 
 
 # Minimal concrete subclass for integration tests
@@ -28,17 +139,12 @@ class TestSystemIntegration:
     
     @pytest.mark.integration
     @pytest.mark.slow
-    async def test_agent_registration_and_discovery_flow(self, mock_boto3_clients, test_environment):
+    async def test_agent_registration_and_discovery_flow(self, mock_boto3_clients, test_environment,
+                                                         text_capability, registry_mock):
         """Test complete flow: agent registration -> discovery -> task execution."""
         
         # Step 1: Create and register an agent
-        capabilities = [
-            Capability(
-                type=CapabilityType.TEXT_PROCESSING,
-                name="Text Processing",
-                description="Processes text content"
-            )
-        ]
+        capabilities = [text_capability]
         
         agent = TestAgent(
             name="Integration Test Agent",
@@ -49,61 +155,53 @@ class TestSystemIntegration:
             success_rate=1.0
         )
         
-        # Mock registry for registration
-        with patch('registry.AgentRegistry') as mock_registry_class:
-            mock_registry = Mock()
-            mock_registry.register_agent.return_value = {
-                'success': True,
-                'agent_id': agent.agent_id,
-                'message': 'Agent registered successfully'
-            }
-            mock_registry_class.return_value = mock_registry
-            
-            # Register the agent
-            registration_result = await agent.register()
-            assert registration_result is True
-            assert agent.is_registered is True
-            
-            # Verify registry was called
-            mock_registry.register_agent.assert_called_once()
+        # Mock registry for registration. The agent built its registry in
+        # __init__, so swap the instance rather than patching the class.
+        # register_agent is called synchronously, so the sync autospec fits.
+        mock_registry = registry_mock
+        mock_registry.register_agent.return_value = {**_REG_OK, 'agent_id': agent.agent_id}
+        agent.registry = mock_registry
+        
+        # Register the agent
+        registration_result = await agent.register()
+        assert registration_result is True
+        assert agent.is_registered is True
+        
+        # Verify registry was called
+        assert mock_registry.register_agent.call_count == 1
         
         # Step 2: Test agent discovery
-        with patch('registry.AgentRegistry') as mock_registry_class:
-            mock_registry = Mock()
-            mock_registry.discover_agents.return_value = {
-                'success': True,
-                'agents': [
-                    {
-                        'agent_id': agent.agent_id,
-                        'name': agent.name,
-                        'description': agent.description,
-                        'capability_types': ['text_processing'],
-                        'status': 'active'
-                    }
-                ],
-                'total_found': 1,
-                'scanned_count': 1
-            }
-            mock_registry_class.return_value = mock_registry
-            
-            # Create discovery request
-            discovery_request = DiscoveryRequest(
-                required_capabilities=[CapabilityType.TEXT_PROCESSING],
-                location_preference="us-east-1",
-                max_results=5
-            )
-            
-            # Discover agents
-            discovery_result = mock_registry.discover_agents(
-                required_capabilities=discovery_request.required_capabilities,
-                location=discovery_request.location_preference,
-                max_results=discovery_request.max_results
-            )
-            
-            assert discovery_result['success'] is True
-            assert discovery_result['total_found'] == 1
-            assert len(discovery_result['agents']) == 1
-            assert discovery_result['agents'][0]['agent_id'] == agent.agent_id
+        mock_registry.discover_agents.return_value = {
+            **_DISCOVERY_OK,
+            'agents': [
+                {
+                    'agent_id': agent.agent_id,
+                    'name': agent.name,
+                    'description': agent.description,
+                    'capability_types': ['text_processing'],
+                    'status': 'active'
+                }
+            ]
+        }
+        
+        # Create discovery request
+        discovery_request = DiscoveryRequest(
+            required_capabilities=[CapabilityType.TEXT_PROCESSING],
+            location_preference="us-east-1",
+            max_results=5
+        )
+        
+        # Discover agents
+        discovery_result = mock_registry.discover_agents(
+            required_capabilities=discovery_request.required_capabilities,
+            location=discovery_request.location_preference,
+            max_results=discovery_request.max_results
+        )
+        
+        assert discovery_result['success'] is True
+        assert discovery_result['total_found'] == 1
+        assert len(discovery_result['agents']) == 1
+        assert discovery_result['agents'][0]['agent_id'] == agent.agent_id
         
         # Step 3: Test task execution
         task = Task(
@@ -191,7 +289,7 @@ class TestSystemIntegration:
                 {
                     'MessageId': 'msg-001',
                     'ReceiptHandle': 'receipt-001',
-                    'Body': json.dumps({
+                    'Body': dumps({
                         'message_id': message.message_id,
                         'message_type': message.message_type,
                         'sender_id': message.sender_id,
@@ -214,59 +312,20 @@ class TestSystemIntegration:
     
     @pytest.mark.integration
     @pytest.mark.slow
-    async def test_discovery_api_integration(self, mock_boto3_clients, test_environment):
+    @pytest.mark.parametrize("event,expected_key", _API_ENDPOINT_CASES)
+    async def test_discovery_api_integration(self, event, expected_key, mock_boto3_clients,
+                                             test_environment):
         """Test discovery API integration."""
         
-        from discovery.discovery_api import lambda_handler as discovery_api_handler
-        
-        # Test GET /agents endpoint
-        get_event = {
-            'httpMethod': 'GET',
-            'path': '/agents',
-            'queryStringParameters': {
-                'capabilities': 'text_processing,data_analysis',
-                'location': 'us-east-1',
-                'limit': '3'
-            }
-        }
-        
         mock_sqs = mock_boto3_clients['sqs']
         mock_sqs.send_message.return_value = {'MessageId': 'msg-001'}
         
-        response = discovery_api_handler(get_event, None)
-        
-        assert response['statusCode'] == 200
-        body = json.loads(response['body'])
-        assert body['success'] is True
-        assert 'request_id' in body
-        
-        # Test POST /agents endpoint
-        agent_data = {
-            'name': 'API Test Agent',
-            'description': 'Agent created via API',
-            'capabilities': [
-                {
-                    'type': 'text_processing',
-                    'name': 'Text Processing',
-                    'description': 'Processes text'
-                }
-            ],
-            'contact_info': {'email': 'api@test.com'},
-            'location': 'us-east-1'
-        }
-        
-        post_event = {
-            'httpMethod': 'POST',
-            'path': '/agents',
-            'body': json.dumps(agent_data)
-        }
-        
-        response = discovery_api_handler(post_event, None)
+        response = discovery_api_handler(event, None)
         
         assert response['statusCode'] == 200
-        body = json.loads(response['body'])
+        body = loads(response['body'])
         assert body['success'] is True
-        assert 'agent_id' in body
+        assert expected_key in body
     
     @pytest.mark.integration
     @pytest.mark.slow
@@ -388,66 +447,55 @@ class TestPerformanceIntegration:
     
     @pytest.mark.integration
     @pytest.mark.slow
-    async def test_concurrent_agent_registration(self, mock_boto3_clients, test_environment):
+    @pytest.mark.parametrize("n", [5, 50, 500])
+    async def test_concurrent_agent_registration(self, n, mock_boto3_clients, test_environment,
+                                                 text_capability):
         """Test concurrent agent registration."""
         
         registry = AgentRegistry("test-registry", "us-east-1")
         mock_table = mock_boto3_clients['table']
         mock_table.put_item.return_value = {'ConsumedCapacity': {'CapacityUnits': 1.0}}
         
-        # Create multiple agents
-        agents = []
-        for i in range(5):
-            agent_card = AgentCard(
+        # Create multiple agents; each gets its own id, timestamps and
+        # capabilities list, while the read-only capability is shared
+        agents = [
+            AgentCard(
                 name=f"Concurrent Agent {i}",
                 description=f"Agent {i} for concurrent testing",
-                capabilities=[
-                    Capability(
-                        type=CapabilityType.TEXT_PROCESSING,
-                        name=f"Text Processing {i}",
-                        description=f"Text processing capability {i}"
-                    )
-                ],
+                capabilities=[text_capability],
                 success_rate=1.0
             )
-            agents.append(agent_card)
-        
-        # Register agents concurrently
-        async def register_agent(agent_card):
-            return registry.register_agent(agent_card)
+            for i in range(n)
+        ]
         
-        tasks = [register_agent(agent_card) for agent_card in agents]
-        results = await asyncio.gather(*tasks)
+        # Register agents concurrently. register_agent blocks on DynamoDB,
+        # so run it on worker threads; awaiting it directly would serialize.
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, registry.register_agent, agent_card)
+                for agent_card in agents
+            ))
         
         # Verify all registrations succeeded
         for result in results:
             assert result['success'] is True
         
         # Verify all agents were registered
-        assert len(results) == 5
+        assert len(results) == n
+        assert mock_table.put_item.call_count == n
     
     @pytest.mark.integration
     @pytest.mark.slow
-    async def test_bulk_discovery_operations(self, mock_boto3_clients, test_environment):
+    @pytest.mark.parametrize("per_page", _BULK_PAGE_SIZES)
+    async def test_bulk_discovery_operations(self, per_page, mock_boto3_clients, test_environment):
         """Test bulk discovery operations."""
         
         registry = AgentRegistry("test-registry", "us-east-1")
         mock_table = mock_boto3_clients['table']
         
-        # Mock multiple agents in scan results
-        mock_table.scan.return_value = {
-            'Items': [
-                {
-                    'agent_id': f'agent-{i}',
-                    'name': f'Agent {i}',
-                    'capability_types': ['text_processing', 'data_analysis'],
-                    'status': 'active'
-                }
-                for i in range(10)
-            ],
-            'ScannedCount': 10,
-            'Count': 10
-        }
+        # Mock a full page of agents in scan results
+        mock_table.scan.return_value = _BULK_SCAN_RESPONSES[per_page]
         
         # Test discovery with different capability combinations
         discovery_requests = [
@@ -457,10 +505,15 @@ class TestPerformanceIntegration:
         ]
         
         for capabilities in discovery_requests:
-            result = registry.discover_agents(capabilities)
+            result = registry.discover_agents(capabilities, max_results=per_page)
             assert result['success'] is True
-            assert result['total_found'] == 10
-            assert len(result['agents']) == 10
+            assert result['total_found'] == per_page
+            assert len(result['agents']) == per_page
+        
+        # discover_agents issues one Limit-bounded scan per request
+        assert mock_table.scan.call_count == len(discovery_requests)
+        for scan_call in mock_table.scan.call_args_list:
+            assert scan_call.kwargs['Limit'] == per_page
 
 
 class TestSecurityIntegration:
@@ -471,8 +524,6 @@ class TestSecurityIntegration:
     async def test_input_validation_integration(self, mock_boto3_clients, test_environment):
         """Test input validation across the system."""
         
-        from discovery.discovery_api import lambda_handler as discovery_api_handler
-        
         # Test malicious input in API
         malicious_event = {
             'httpMethod': 'GET',
@@ -487,16 +538,10 @@ class TestSecurityIntegration:
         assert response['statusCode'] == 400
         
         # Test oversized payload
-        oversized_payload = {
-            'name': 'A' * 10000,  # Very long name
-            'description': 'A' * 50000,  # Very long description
-            'capabilities': []
-        }
-        
         oversized_event = {
             'httpMethod': 'POST',
             'path': '/agents',
-            'body': json.dumps(oversized_payload)
+            'body': _OVERSIZED_AGENT_JSON
         }
         
         response = discovery_api_handler(oversized_event, None)
@@ -504,7 +549,8 @@ class TestSecurityIntegration:
     
     @pytest.mark.integration
     @pytest.mark.slow
-    async def test_authentication_integration(self, mock_boto3_clients, test_environment):
+    async def test_authentication_integration(self, mock_boto3_clients, test_environment,
+                                              registry_mock):
         """Test authentication and authorization."""
         
         # Test agent registration with invalid credentials
@@ -521,13 +567,12 @@ class TestSecurityIntegration:
             registry_table="test-registry"
         )
         
-        # Mock registry to simulate authentication failure
-        with patch('registry.AgentRegistry') as mock_registry_class:
-            from botocore.exceptions import ClientError
-            error_response = {'Error': {'Code': 'UnauthorizedOperation'}}
-            mock_registry = Mock()
-            mock_registry.register_agent.side_effect = ClientError(error_response, 'RegisterAgent')
-            mock_registry_class.return_value = mock_registry
-            
-            registration_result = await agent.register()
-            assert registration_result is False 
\ No newline at end of file
+        # Mock registry to simulate authentication failure. register_agent is
+        # synchronous, so the error is raised from the sync autospec.
+        error_response = {'Error': {'Code': 'UnauthorizedOperation'}}
+        registry_mock.register_agent.side_effect = ClientError(error_response, 'RegisterAgent')
+        agent.registry = registry_mock
+        
+        registration_result = await agent.register()
+        assert registration_result is False
+        assert agent.is_registered is False 
\ No newline at end of file
@@ -3,8 +3,14 @@ Unit tests for the A2A protocol module.
 """
 
 import pytest
-from datetime import datetime
-from unittest.mock import Mock, patch
+from types import MappingProxyType
+from datetime import datetime, timedelta
+from freezegun import freeze_time
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
 
 from protocol import (
     MessageType, TaskStatus, TaskPriority, CapabilityType,
@@ -15,45 +21,108 @@ from protocol import (
 )
 
 
+# Read-only field values shared across tests; models copy them into dicts
+_CAP_PARAMS = MappingProxyType({"max_length": 1000})
+_CONTACT_INFO = MappingProxyType({"email": "test@example.com"})
+
+# Expected members of each protocol enum; exact equality also catches
+# members being added or removed
+_MESSAGE_TYPES = {
+    "DISCOVERY_REQUEST": "discovery_request",
+    "DISCOVERY_RESPONSE": "discovery_response",
+    "TASK_REQUEST": "task_request",
+    "TASK_RESPONSE": "task_response",
+    "TASK_UPDATE": "task_update",
+    "HEARTBEAT": "heartbeat",
+    "REGISTRATION": "registration",
+    "DEREGISTRATION": "deregistration",
+}
+
+_TASK_STATUSES = {
+    "PENDING": "pending",
+    "IN_PROGRESS": "in_progress",
+    "COMPLETED": "completed",
+    "FAILED": "failed",
+    "CANCELLED": "cancelled",
+}
+
+_TASK_PRIORITIES = {
+    "LOW": "low",
+    "NORMAL": "normal",
+    "HIGH": "high",
+    "URGENT": "urgent",
+}
+
+_CAPABILITY_TYPES = {
+    "TEXT_PROCESSING": "text_processing",
+    "IMAGE_PROCESSING": "image_processing",
+    "DATA_ANALYSIS": "data_analysis",
+    "WEB_SCRAPING": "web_scraping",
+    "API_INTEGRATION": "api_integration",
+    "MACHINE_LEARNING": "machine_learning",
+    "FILE_PROCESSING": "file_processing",
+    "DATABASE_OPERATIONS": "database_operations",
+    "CUSTOM": "custom",
+}
+
+
+# (Message kwargs, expected attributes) for explicit and defaulted fields
+_MESSAGE_CASES = [
+    pytest.param(
+        {
+            'message_id': "msg-001",
+            'message_type': MessageType.TASK_REQUEST,
+            'sender_id': "sender-agent",
+            'recipient_id': "recipient-agent",
+            'payload': {"task": "data"},
+            'correlation_id': "corr-001",
+            'reply_to': "reply-queue",
+        },
+        {
+            'message_id': "msg-001",
+            'message_type': MessageType.TASK_REQUEST,
+            'sender_id': "sender-agent",
+            'recipient_id': "recipient-agent",
+            'payload': {"task": "data"},
+            'correlation_id': "corr-001",
+            'reply_to': "reply-queue",
+        },
+        id='creation',
+    ),
+    pytest.param(
+        {
+            'message_type': MessageType.HEARTBEAT,
+            'sender_id': "test-agent",
+        },
+        {
+            'recipient_id': None,
+            'payload': {},
+            'correlation_id': None,
+            'reply_to': None,
+        },
+        id='defaults',
+    ),
+]
+
+
 class TestProtocolEnums:
     """Test protocol enums and constants."""
     
     def test_message_types(self):
         """Test MessageType enum values."""
-        assert MessageType.DISCOVERY_REQUEST == "discovery_request"
-        assert MessageType.DISCOVERY_RESPONSE == "discovery_response"
-        assert MessageType.TASK_REQUEST == "task_request"
-        assert MessageType.TASK_RESPONSE == "task_response"
-        assert MessageType.HEARTBEAT == "heartbeat"
-        assert MessageType.REGISTRATION == "registration"
-        assert MessageType.DEREGISTRATION == "deregistration"
+        assert {m.name: m.value for m in MessageType} == _MESSAGE_TYPES
     
     def test_task_status(self):
         """Test TaskStatus enum values."""
-        assert TaskStatus.PENDING == "pending"
-        assert TaskStatus.IN_PROGRESS == "in_progress"
-        assert TaskStatus.COMPLETED == "completed"
-        assert TaskStatus.FAILED == "failed"
-        assert TaskStatus.CANCELLED == "cancelled"
+        assert {m.name: m.value for m in TaskStatus} == _TASK_STATUSES
     
     def test_task_priority(self):
         """Test TaskPriority enum values."""
-        assert TaskPriority.LOW == "low"
-        assert TaskPriority.NORMAL == "normal"
-        assert TaskPriority.HIGH == "high"
-        assert TaskPriority.URGENT == "urgent"
+        assert {m.name: m.value for m in TaskPriority} == _TASK_PRIORITIES
     
     def test_capability_types(self):
         """Test CapabilityType enum values."""
-        assert CapabilityType.TEXT_PROCESSING == "text_processing"
-        assert CapabilityType.IMAGE_PROCESSING == "image_processing"
-        assert CapabilityType.DATA_ANALYSIS == "data_analysis"
-        assert CapabilityType.WEB_SCRAPING == "web_scraping"
-        assert CapabilityType.API_INTEGRATION == "api_integration"
-        assert CapabilityType.MACHINE_LEARNING == "machine_learning"
-        assert CapabilityType.FILE_PROCESSING == "file_processing"
-        assert CapabilityType.DATABASE_OPERATIONS == "database_operations"
-        assert CapabilityType.CUSTOM == "custom"
+        assert {m.name: m.value for m in CapabilityType} == _CAPABILITY_TYPES
     
     def test_protocol_version(self):
         """Test protocol version constant."""
@@ -69,15 +138,15 @@ class TestCapability:
             type=CapabilityType.TEXT_PROCESSING,
             name="Text Analysis",
             description="Analyzes text content",
-            parameters={"max_length": 1000},
+            parameters=_CAP_PARAMS,
             version="1.0.0",
             confidence=0.95
         )
         
-        assert cap.type == CapabilityType.TEXT_PROCESSING
+        assert cap.type is CapabilityType.TEXT_PROCESSING
         assert cap.name == "Text Analysis"
         assert cap.description == "Analyzes text content"
-        assert cap.parameters == {"max_length": 1000}
+        assert cap.parameters == _CAP_PARAMS
         assert cap.version == "1.0.0"
         assert cap.confidence == 0.95
     
@@ -93,46 +162,46 @@ class TestCapability:
         assert cap.version == "1.0.0"
         assert cap.confidence == 1.0
     
-    def test_capability_validation(self):
-        """Test capability validation."""
-        # Test confidence bounds
+    @pytest.mark.parametrize("confidence", [1.5, -0.1, 2.0, -1e-9])
+    def test_capability_confidence_bounds(self, confidence):
+        """Test capability confidence must lie within [0.0, 1.0]."""
         with pytest.raises(ValueError):
             Capability(
                 type=CapabilityType.TEXT_PROCESSING,
                 name="Test",
                 description="Test",
-                confidence=1.5  # Should be <= 1.0
-            )
-        
-        with pytest.raises(ValueError):
-            Capability(
-                type=CapabilityType.TEXT_PROCESSING,
-                name="Test",
-                description="Test",
-                confidence=-0.1  # Should be >= 0.0
+                confidence=confidence
             )
 
 
+@pytest.fixture(scope="module")
+def sample_text_capability():
+    """Text capability shared by tests that only read it."""
+    return Capability(
+        type=CapabilityType.TEXT_PROCESSING,
+        name="Text Processing",
+        description="Processes text"
+    )
+
+
+@pytest.fixture(scope="module")
+def sample_capabilities(sample_text_capability):
+    """Capability list for agent cards that are not mutated."""
+    return [sample_text_capability]
+
+
 class TestAgentCard:
     """Test AgentCard class."""
     
-    def test_agent_card_creation(self):
+    def test_agent_card_creation(self, sample_capabilities):
         """Test creating an agent card."""
-        capabilities = [
-            Capability(
-                type=CapabilityType.TEXT_PROCESSING,
-                name="Text Processing",
-                description="Processes text"
-            )
-        ]
-        
         card = AgentCard(
             agent_id="test-agent-001",
             name="Test Agent",
             description="A test agent",
             version="1.0.0",
-            capabilities=capabilities,
-            contact_info={"email": "test@example.com"},
+            capabilities=sample_capabilities,
+            contact_info=_CONTACT_INFO,
             location="us-east-1",
             tags=["test", "demo"],
             success_rate=0.98
@@ -143,26 +212,18 @@ class TestAgentCard:
         assert card.description == "A test agent"
         assert card.version == "1.0.0"
         assert len(card.capabilities) == 1
-        assert card.contact_info == {"email": "test@example.com"}
+        assert card.contact_info == _CONTACT_INFO
         assert card.location == "us-east-1"
         assert card.tags == ["test", "demo"]
         assert card.status == "active"
         assert card.success_rate == 0.98
     
-    def test_agent_card_defaults(self):
+    def test_agent_card_defaults(self, sample_capabilities):
         """Test agent card with default values."""
-        capabilities = [
-            Capability(
-                type=CapabilityType.DATA_ANALYSIS,
-                name="Data Analysis",
-                description="Analyzes data"
-            )
-        ]
-        
         card = AgentCard(
             name="Test Agent",
             description="A test agent",
-            capabilities=capabilities
+            capabilities=sample_capabilities
         )
         
         assert card.agent_id is not None
@@ -176,6 +237,7 @@ class TestAgentCard:
     
     def test_agent_card_methods(self):
         """Test agent card methods."""
+        # Built per test: this card's capabilities are added and removed below
         capabilities = [
             Capability(type=CapabilityType.TEXT_PROCESSING, name="Text", description="Text"),
             Capability(type=CapabilityType.DATA_ANALYSIS, name="Data", description="Data")
@@ -194,7 +256,7 @@ class TestAgentCard:
         # Test getting capability
         text_cap = card.get_capability(CapabilityType.TEXT_PROCESSING)
         assert text_cap is not None
-        assert text_cap.type == CapabilityType.TEXT_PROCESSING
+        assert text_cap.type is CapabilityType.TEXT_PROCESSING
         
         # Test adding capability
         new_cap = Capability(type=CapabilityType.API_INTEGRATION, name="API", description="API")
@@ -205,13 +267,15 @@ class TestAgentCard:
         assert card.remove_capability(CapabilityType.TEXT_PROCESSING) is True
         assert card.has_capability(CapabilityType.TEXT_PROCESSING) is False
         
-        # Test updating last seen
-        old_last_seen = card.last_seen
-        card.update_last_seen()
-        assert card.last_seen > old_last_seen
-        
-        # Test active status
-        assert card.is_active() is True
+        # Test updating last seen against a fixed clock, so the check does not
+        # depend on the wall clock advancing between two utcnow() calls
+        card.last_seen = datetime(2024, 1, 1, 0, 0, 0)
+        with freeze_time(datetime(2024, 1, 1, 0, 0, 1)):
+            card.update_last_seen()
+            assert card.last_seen == datetime(2024, 1, 1, 0, 0, 1)
+            
+            # Test active status
+            assert card.is_active() is True
         
         # Test summary
         summary = card.get_summary()
@@ -242,10 +306,10 @@ class TestTask:
         assert task.description == "A test task"
         assert task.required_capabilities == [CapabilityType.TEXT_PROCESSING]
         assert task.parameters == {"text": "Hello world"}
-        assert task.priority == TaskPriority.HIGH
+        assert task.priority is TaskPriority.HIGH
         assert task.created_by == "test-agent"
         assert task.assigned_to == "worker-agent"
-        assert task.status == TaskStatus.PENDING
+        assert task.status is TaskStatus.PENDING
         assert task.success_rate == 0.95
     
     def test_task_defaults(self):
@@ -259,9 +323,9 @@ class TestTask:
         
         assert task.task_id is not None
         assert task.parameters == {}
-        assert task.priority == TaskPriority.NORMAL
+        assert task.priority is TaskPriority.NORMAL
         assert task.assigned_to is None
-        assert task.status == TaskStatus.PENDING
+        assert task.status is TaskStatus.PENDING
         assert task.result is None
         assert task.error_message is None
         assert task.success_rate == 1.0
@@ -270,38 +334,22 @@ class TestTask:
 class TestMessage:
     """Test Message class."""
     
-    def test_message_creation(self):
-        """Test creating a message."""
-        message = Message(
-            message_id="msg-001",
-            message_type=MessageType.TASK_REQUEST,
-            sender_id="sender-agent",
-            recipient_id="recipient-agent",
-            payload={"task": "data"},
-            correlation_id="corr-001",
-            reply_to="reply-queue"
-        )
-        
-        assert message.message_id == "msg-001"
-        assert message.message_type == MessageType.TASK_REQUEST
-        assert message.sender_id == "sender-agent"
-        assert message.recipient_id == "recipient-agent"
-        assert message.payload == {"task": "data"}
-        assert message.correlation_id == "corr-001"
-        assert message.reply_to == "reply-queue"
-    
-    def test_message_defaults(self):
-        """Test message with default values."""
-        message = Message(
-            message_type=MessageType.HEARTBEAT,
-            sender_id="test-agent"
-        )
+    @pytest.mark.parametrize("kwargs,expected", _MESSAGE_CASES)
+    def test_message_fields(self, kwargs, expected):
+        """Test message fields, explicit and defaulted."""
+        message = Message(**kwargs)
         
         assert message.message_id is not None
-        assert message.recipient_id is None
-        assert message.payload == {}
-        assert message.correlation_id is None
-        assert message.reply_to is None
+        for attr, value in expected.items():
+            assert getattr(message, attr) == value
+
+
+@pytest.fixture
+def frozen_clock():
+    """Fix the clock; tests that compare against now opt in."""
+    fixed = datetime(2024, 6, 1, 12, 0, 0)
+    with freeze_time(fixed):
+        yield fixed
 
 
 class TestProtocolFunctions:
@@ -317,47 +365,63 @@ class TestProtocolFunctions:
             correlation_id="corr-001"
         )
         
-        assert message.message_type == MessageType.DISCOVERY_REQUEST
+        assert message.message_type is MessageType.DISCOVERY_REQUEST
         assert message.sender_id == "test-agent"
         assert message.recipient_id == "discovery-service"
         assert message.payload == {"capabilities": ["text_processing"]}
         assert message.correlation_id == "corr-001"
     
-    def test_validate_message(self):
+    def test_validate_message(self, frozen_clock):
         """Test validate_message function."""
         # Valid message
         valid_message = Message(
             message_type=MessageType.HEARTBEAT,
-            sender_id="test-agent"
+            sender_id="test-agent",
+            timestamp=frozen_clock
         )
         assert validate_message(valid_message) is True
         
         # Invalid message - missing sender_id
         invalid_message = Message(
             message_type=MessageType.HEARTBEAT,
-            sender_id=""
+            sender_id="",
+            timestamp=frozen_clock
         )
         assert validate_message(invalid_message) is False
         
         # Invalid message - future timestamp
         future_message = Message(
             message_type=MessageType.HEARTBEAT,
-            sender_id="test-agent"
+            sender_id="test-agent",
+            timestamp=frozen_clock + timedelta(days=1)
         )
-        future_message.timestamp = datetime(2030, 1, 1)
         assert validate_message(future_message) is False
     
-    def test_get_message_size(self):
-        """Test get_message_size function."""
+    @pytest.mark.parametrize("size_bytes", [256, 1024, 4096])
+    def test_get_message_size(self, size_bytes):
+        """Test get_message_size grows with the payload."""
         message = Message(
             message_type=MessageType.TASK_REQUEST,
             sender_id="test-agent",
-            payload={"data": "test"}
+            payload={"data": "x" * size_bytes}
         )
         
         size = get_message_size(message)
         assert isinstance(size, int)
-        assert size > 0
+        assert size >= size_bytes
+    
+    @pytest.mark.benchmark(group="serialize")
+    @pytest.mark.skipif(pytest_benchmark is None, reason="pytest-benchmark not installed")
+    def test_get_message_size_benchmark(self, benchmark):
+        """Benchmark message serialization; compare runs with --benchmark-compare."""
+        message = Message(
+            message_type=MessageType.TASK_REQUEST,
+            sender_id="test-agent",
+            payload={"data": "x" * 1024}
+        )
+        
+        size = benchmark(get_message_size, message)
+        assert size >= 1024
 
 
 class TestDiscoveryRequest:
@@ -395,31 +459,32 @@ class TestDiscoveryRequest:
         assert request.filters is None
 
 
+@pytest.fixture(scope="session")
+def agent_metadata_batch():
+    """Two agents' metadata, built once; responses only read them."""
+    agent_ids = ("agent-1", "agent-2")
+    names = ("Agent 1", "Agent 2")
+    descriptions = ("Test agent 1", "Test agent 2")
+    return [
+        AgentMetadata(
+            agent_id=agent_id,
+            name=name,
+            description=description,
+            version="1.0.0",
+            capabilities=[]
+        )
+        for agent_id, name, description in zip(agent_ids, names, descriptions)
+    ]
+
+
 class TestDiscoveryResponse:
     """Test DiscoveryResponse class."""
     
-    def test_discovery_response_creation(self):
+    def test_discovery_response_creation(self, agent_metadata_batch):
         """Test creating a discovery response."""
-        agents = [
-            AgentMetadata(
-                agent_id="agent-1",
-                name="Agent 1",
-                description="Test agent 1",
-                version="1.0.0",
-                capabilities=[]
-            ),
-            AgentMetadata(
-                agent_id="agent-2",
-                name="Agent 2",
-                description="Test agent 2",
-                version="1.0.0",
-                capabilities=[]
-            )
-        ]
-        
         response = DiscoveryResponse(
             request_id="req-001",
-            agents=agents,
+            agents=agent_metadata_batch,
             total_found=2,
             search_duration_ms=150
         )
@@ -432,26 +497,29 @@ class TestDiscoveryResponse:
         assert response.search_duration_ms == 150
 
 
+# Task used only as input to the request wrappers; Task construction
+# itself is covered by TestTask
+_BASE_TASK = Task(
+    title="Test Task",
+    description="A test task",
+    required_capabilities=[CapabilityType.TEXT_PROCESSING],
+    created_by="test-agent"
+)
+
+
 class TestTaskRequest:
     """Test TaskRequest class."""
     
     def test_task_request_creation(self):
         """Test creating a task request."""
-        task = Task(
-            title="Test Task",
-            description="A test task",
-            required_capabilities=[CapabilityType.TEXT_PROCESSING],
-            created_by="test-agent"
-        )
-        
         request = TaskRequest(
-            task=task,
+            task=_BASE_TASK,
             expected_duration_minutes=30,
             retry_count=0,
             max_retries=3
         )
         
-        assert request.task == task
+        assert request.task == _BASE_TASK
         assert request.expected_duration_minutes == 30
         assert request.retry_count == 0
         assert request.max_retries == 3
@@ -471,7 +539,7 @@ class TestTaskResponse:
         )
         
         assert response.task_id == "task-001"
-        assert response.status == TaskStatus.COMPLETED
+        assert response.status is TaskStatus.COMPLETED
         assert response.result == {"processed": True}
         assert response.error_message is None
         assert response.execution_time_ms == 1500
@@ -3,70 +3,273 @@ Unit tests for the A2A registry module.
 """
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError, NoCredentialsError
 
 from registry import AgentRegistry
 from protocol import AgentCard, Capability, CapabilityType
 
 
+# AgentRegistry stamps times with datetime.utcnow(), deprecated from Python 3.12
+pytestmark = pytest.mark.filterwarnings("ignore:datetime.datetime.utcnow:DeprecationWarning")
+
+# Capability type the tests register and discover agents by
+_TEXT_PROCESSING = CapabilityType.TEXT_PROCESSING
+
+# Scan pages returned by the mock table. The registry only reads them, apart
+# from discover_agents sorting 'Items' in place by last_seen; these items have
+# none, so the stable sort leaves them as built.
+_DISCOVER_SCAN = {
+    'Items': [
+        {
+            'agent_id': 'agent-1',
+            'name': 'Agent 1',
+            'capability_types': ['text_processing'],
+            'status': 'active'
+        },
+        {
+            'agent_id': 'agent-2',
+            'name': 'Agent 2',
+            'capability_types': ['data_analysis'],
+            'status': 'active'
+        }
+    ],
+    'ScannedCount': 2
+}
+
+_FILTERED_DISCOVER_SCAN = {
+    'Items': [
+        {
+            'agent_id': 'agent-1',
+            'name': 'Agent 1',
+            'capability_types': ['text_processing'],
+            'status': 'active',
+            'location_index': 'us-east-1'
+        }
+    ],
+    'ScannedCount': 1
+}
+
+_LIST_ALL_SCAN = {
+    'Items': [
+        {
+            'agent_id': 'agent-1',
+            'name': 'Agent 1',
+            'status': 'active'
+        },
+        {
+            'agent_id': 'agent-2',
+            'name': 'Agent 2',
+            'status': 'inactive'
+        }
+    ]
+}
+
+_LIST_ACTIVE_SCAN = {
+    'Items': [
+        {
+            'agent_id': 'agent-1',
+            'name': 'Agent 1',
+            'status': 'active'
+        }
+    ]
+}
+
+_STATISTICS_SCAN = {
+    'Items': [
+        {
+            'agent_id': 'agent-1',
+            'name': 'Agent 1',
+            'status': 'active',
+            'capability_types': ['text_processing'],
+            'location': 'us-east-1'
+        },
+        {
+            'agent_id': 'agent-2',
+            'name': 'Agent 2',
+            'status': 'inactive',
+            'capability_types': ['data_analysis'],
+            'location': 'us-west-2'
+        }
+    ]
+}
+
+
+def _client_error(code, operation):
+    """Build a botocore ClientError carrying the given error code."""
+    return ClientError({'Error': {'Code': code}}, operation)
+
+
+# (discover_agents filters, scan page, agents found, expected filter values)
+_DISCOVER_CASES = [
+    pytest.param(
+        {},
+        _DISCOVER_SCAN,
+        2,
+        {':cap0': 'text_processing', ':status': 'active'},
+        id='capabilities_only',
+    ),
+    pytest.param(
+        {'location': "us-east-1", 'tags': ["test"]},
+        _FILTERED_DISCOVER_SCAN,
+        1,
+        {':cap0': 'text_processing', ':location': 'us-east-1', ':tag0': True, ':status': 'active'},
+        id='location_and_tags',
+    ),
+]
+
+
+# (boto3.resource error, expected message) for registry construction
+_INIT_ERROR_CASES = [
+    pytest.param(NoCredentialsError(), "AWS credentials not found", id='no_credentials'),
+    pytest.param(
+        _client_error('ResourceNotFoundException', 'DescribeTable'),
+        "DynamoDB table 'test-table' not found",
+        id='table_not_found',
+    ),
+]
+
+# (table method, error code, operation, registry call, error prefix)
+_OPERATION_ERROR_CASES = [
+    pytest.param(
+        'put_item', 'ConditionalCheckFailedException', 'PutItem',
+        lambda registry, card: registry.register_agent(card),
+        "DynamoDB error",
+        id='register_agent',
+    ),
+    pytest.param(
+        'scan', 'ValidationException', 'Scan',
+        lambda registry, card: registry.discover_agents([_TEXT_PROCESSING]),
+        "Discovery failed",
+        id='discover_agents',
+    ),
+    pytest.param(
+        'update_item', 'ConditionalCheckFailedException', 'UpdateItem',
+        lambda registry, card: registry.update_agent("non-existent-agent", {'name': 'New Name'}),
+        "Agent not found",
+        id='update_agent_not_found',
+    ),
+]
+
+
+# (registry call, table method, check on the call's kwargs) for write operations
+_OPERATION_SUCCESS_CASES = [
+    pytest.param(
+        lambda registry: registry.update_agent("test-agent-001", {
+            'name': 'Updated Agent',
+            'description': 'Updated description'
+        }),
+        'update_item',
+        lambda call_args: 'UpdateExpression' in call_args,
+        id='update_agent',
+    ),
+    pytest.param(
+        lambda registry: registry.update_agent_heartbeat("test-agent-001"),
+        'update_item',
+        lambda call_args: ':last_seen' in call_args['ExpressionAttributeValues'],
+        id='update_agent_heartbeat',
+    ),
+    pytest.param(
+        lambda registry: registry.deregister_agent("test-agent-001"),
+        'delete_item',
+        lambda call_args: call_args.keys() == {'Key'},
+        id='deregister_agent',
+    ),
+]
+
+
+class _FakeTable:
+    """DynamoDB Table stand-in exposing only the methods AgentRegistry calls."""
+    
+    __slots__ = ('put_item', 'get_item', 'scan', 'update_item', 'delete_item')
+    
+    def __init__(self):
+        for method in self.__slots__:
+            setattr(self, method, Mock())
+
+
+@pytest.fixture
+def registry_ctx(monkeypatch):
+    """Registry backed by a mock DynamoDB table."""
+    mock_table = _FakeTable()
+    fake_resource = SimpleNamespace(Table=lambda name: mock_table)
+    monkeypatch.setattr('registry.registry.boto3', SimpleNamespace(
+        resource=lambda *_args, **_kwargs: fake_resource
+    ))
+    return SimpleNamespace(
+        registry=AgentRegistry("test-table", "us-east-1"),
+        table=mock_table
+    )
+
+
+@pytest.fixture(scope="module")
+def sample_capability():
+    """Text capability shared by the registration tests."""
+    return Capability(
+        type=_TEXT_PROCESSING,
+        name="Text Processing",
+        description="Processes text"
+    )
+
+
+@pytest.fixture(scope="module")
+def agent_card(sample_capability):
+    """Valid agent card; register_agent only reads it."""
+    return AgentCard(
+        agent_id="test-agent-001",
+        name="Test Agent",
+        description="A test agent",
+        capabilities=[sample_capability],
+        success_rate=1.0
+    )
+
+
+@pytest.fixture(scope="session")
+def _shared_registry():
+    """Registry constructed once for the tests that only read through it."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr('registry.registry.boto3', SimpleNamespace(
+            resource=lambda *_args, **_kwargs: SimpleNamespace(Table=lambda name: None)
+        ))
+        return AgentRegistry("test-table", "us-east-1")
+
+
+@pytest.fixture
+def shared_registry_ctx(_shared_registry):
+    """Session registry with a fresh fake table swapped in for this test."""
+    mock_table = _FakeTable()
+    _shared_registry.table = mock_table
+    return SimpleNamespace(registry=_shared_registry, table=mock_table)
+
+
 class TestAgentRegistry:
     """Test AgentRegistry class."""
     
-    @patch('boto3.resource')
-    def test_registry_initialization(self, mock_boto3):
+    def test_registry_initialization(self, registry_ctx):
         """Test registry initialization."""
-        mock_table = Mock()
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = registry_ctx.registry
+        mock_table = registry_ctx.table
         
         assert registry.table_name == "test-table"
         assert registry.region == "us-east-1"
         assert registry.table == mock_table
     
-    @patch('boto3.resource')
-    def test_registry_initialization_no_credentials(self, mock_boto3):
-        """Test registry initialization without AWS credentials."""
-        from botocore.exceptions import NoCredentialsError
-        mock_boto3.side_effect = NoCredentialsError()
-        
-        with pytest.raises(Exception, match="AWS credentials not found"):
-            AgentRegistry("test-table", "us-east-1")
-    
-    @patch('boto3.resource')
-    def test_registry_initialization_table_not_found(self, mock_boto3):
-        """Test registry initialization with non-existent table."""
-        from botocore.exceptions import ClientError
-        error_response = {'Error': {'Code': 'ResourceNotFoundException'}}
-        mock_boto3.side_effect = ClientError(error_response, 'DescribeTable')
-        
-        with pytest.raises(Exception, match="DynamoDB table 'test-table' not found"):
+    @pytest.mark.parametrize("error,expected", _INIT_ERROR_CASES)
+    def test_registry_initialization_errors(self, monkeypatch, error, expected):
+        """Test registry initialization when DynamoDB cannot be reached."""
+        def fail(*_args, **_kwargs):
+            raise error
+        monkeypatch.setattr('registry.registry.boto3', SimpleNamespace(resource=fail))
+        
+        with pytest.raises(Exception, match=expected):
             AgentRegistry("test-table", "us-east-1")
     
-    @patch('boto3.resource')
-    def test_register_agent_success(self, mock_boto3):
+    def test_register_agent_success(self, registry_ctx, agent_card):
         """Test successful agent registration."""
-        mock_table = Mock()
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        capabilities = [
-            Capability(
-                type=CapabilityType.TEXT_PROCESSING,
-                name="Text Processing",
-                description="Processes text"
-            )
-        ]
-        
-        agent_card = AgentCard(
-            agent_id="test-agent-001",
-            name="Test Agent",
-            description="A test agent",
-            capabilities=capabilities,
-            success_rate=1.0
-        )
+        registry = registry_ctx.registry
+        mock_table = registry_ctx.table
         
         result = registry.register_agent(agent_card)
         
@@ -76,18 +279,16 @@ class TestAgentRegistry:
         
         # Verify DynamoDB put_item was called
         mock_table.put_item.assert_called_once()
-        call_args = mock_table.put_item.call_args[1]['Item']
-        assert call_args['agent_id'] == "test-agent-001"
-        assert call_args['name'] == "Test Agent"
-        assert call_args['capability_types'] == ["text_processing"]
+        item = mock_table.put_item.call_args[1]['Item']
+        assert {key: item[key] for key in ('agent_id', 'name', 'capability_types')} == {
+            'agent_id': "test-agent-001",
+            'name': "Test Agent",
+            'capability_types': ["text_processing"]
+        }
     
-    @patch('boto3.resource')
-    def test_register_agent_validation_error(self, mock_boto3):
+    def test_register_agent_validation_error(self, registry_ctx):
         """Test agent registration with validation errors."""
-        mock_table = Mock()
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = registry_ctx.registry
         
         # Create invalid agent card (missing required fields)
         agent_card = AgentCard(
@@ -104,45 +305,9 @@ class TestAgentRegistry:
         assert 'errors' in result
         assert len(result['errors']) > 0
     
-    @patch('boto3.resource')
-    def test_register_agent_dynamodb_error(self, mock_boto3):
-        """Test agent registration with DynamoDB error."""
-        from botocore.exceptions import ClientError
-        
-        mock_table = Mock()
-        mock_table.put_item.side_effect = ClientError(
-            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 
-            'PutItem'
-        )
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        capabilities = [
-            Capability(
-                type=CapabilityType.TEXT_PROCESSING,
-                name="Text Processing",
-                description="Processes text"
-            )
-        ]
-        
-        agent_card = AgentCard(
-            agent_id="test-agent-001",
-            name="Test Agent",
-            description="A test agent",
-            capabilities=capabilities,
-            success_rate=1.0
-        )
-        
-        result = registry.register_agent(agent_card)
-        
-        assert result['success'] is False
-        assert "DynamoDB error" in result['error']
-    
-    @patch('boto3.resource')
-    def test_get_agent_success(self, mock_boto3):
+    def test_get_agent_success(self, shared_registry_ctx):
         """Test successful agent retrieval."""
-        mock_table = Mock()
+        mock_table = shared_registry_ctx.table
         mock_table.get_item.return_value = {
             'Item': {
                 'agent_id': 'test-agent-001',
@@ -150,9 +315,8 @@ class TestAgentRegistry:
                 'description': 'A test agent'
             }
         }
-        mock_boto3.return_value.Table.return_value = mock_table
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = shared_registry_ctx.registry
         
         agent = registry.get_agent("test-agent-001")
         
@@ -160,292 +324,131 @@ class TestAgentRegistry:
         assert agent['agent_id'] == "test-agent-001"
         assert agent['name'] == "Test Agent"
         
-        mock_table.get_item.assert_called_once_with(Key={'agent_id': 'test-agent-001'})
+        assert mock_table.get_item.call_count == 1
+        assert mock_table.get_item.call_args.kwargs == {'Key': {'agent_id': 'test-agent-001'}}
     
-    @patch('boto3.resource')
-    def test_get_agent_not_found(self, mock_boto3):
+    def test_get_agent_not_found(self, shared_registry_ctx):
         """Test agent retrieval when agent doesn't exist."""
-        mock_table = Mock()
+        mock_table = shared_registry_ctx.table
         mock_table.get_item.return_value = {}
-        mock_boto3.return_value.Table.return_value = mock_table
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = shared_registry_ctx.registry
         
         agent = registry.get_agent("non-existent-agent")
         
         assert agent is None
     
-    @patch('boto3.resource')
-    def test_discover_agents_success(self, mock_boto3):
-        """Test successful agent discovery."""
-        mock_table = Mock()
-        mock_table.scan.return_value = {
-            'Items': [
-                {
-                    'agent_id': 'agent-1',
-                    'name': 'Agent 1',
-                    'capability_types': ['text_processing'],
-                    'status': 'active'
-                },
-                {
-                    'agent_id': 'agent-2',
-                    'name': 'Agent 2',
-                    'capability_types': ['data_analysis'],
-                    'status': 'active'
-                }
-            ],
-            'ScannedCount': 2
-        }
-        mock_boto3.return_value.Table.return_value = mock_table
+    @pytest.mark.parametrize("filters,scan,expected_found,expected_values", _DISCOVER_CASES)
+    def test_discover_agents(self, shared_registry_ctx, filters, scan, expected_found,
+                             expected_values):
+        """Test agent discovery with and without filters."""
+        mock_table = shared_registry_ctx.table
+        mock_table.scan.return_value = scan
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = shared_registry_ctx.registry
         
-        result = registry.discover_agents([CapabilityType.TEXT_PROCESSING])
+        result = registry.discover_agents([_TEXT_PROCESSING], **filters)
         
         assert result['success'] is True
-        assert result['total_found'] == 2
-        assert result['scanned_count'] == 2
-        assert len(result['agents']) == 2
-    
-    @patch('boto3.resource')
-    def test_discover_agents_with_filters(self, mock_boto3):
-        """Test agent discovery with filters."""
-        mock_table = Mock()
-        mock_table.scan.return_value = {
-            'Items': [
-                {
-                    'agent_id': 'agent-1',
-                    'name': 'Agent 1',
-                    'capability_types': ['text_processing'],
-                    'status': 'active',
-                    'location_index': 'us-east-1'
-                }
-            ],
-            'ScannedCount': 1
-        }
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        result = registry.discover_agents(
-            required_capabilities=[CapabilityType.TEXT_PROCESSING],
-            location="us-east-1",
-            tags=["test"]
+        assert (result['total_found'], result['scanned_count'], len(result['agents'])) == (
+            expected_found, expected_found, expected_found
         )
         
-        assert result['success'] is True
-        assert result['total_found'] == 1
+        # Verify the filters reached the scan
+        scan_kwargs = mock_table.scan.call_args.kwargs
+        assert 'FilterExpression' in scan_kwargs
+        assert scan_kwargs['ExpressionAttributeValues'] == expected_values
     
-    @patch('boto3.resource')
-    def test_discover_agents_dynamodb_error(self, mock_boto3):
-        """Test agent discovery with DynamoDB error."""
-        from botocore.exceptions import ClientError
-        
-        mock_table = Mock()
-        mock_table.scan.side_effect = ClientError(
-            {'Error': {'Code': 'ValidationException'}}, 
-            'Scan'
-        )
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        result = registry.discover_agents([CapabilityType.TEXT_PROCESSING])
-        
-        assert result['success'] is False
-        assert "Discovery failed" in result['error']
-    
-    @patch('boto3.resource')
-    def test_list_all_agents_success(self, mock_boto3):
+    def test_list_all_agents_success(self, shared_registry_ctx):
         """Test successful listing of all agents."""
-        mock_table = Mock()
-        mock_table.scan.return_value = {
-            'Items': [
-                {
-                    'agent_id': 'agent-1',
-                    'name': 'Agent 1',
-                    'status': 'active'
-                },
-                {
-                    'agent_id': 'agent-2',
-                    'name': 'Agent 2',
-                    'status': 'inactive'
-                }
-            ]
-        }
-        mock_boto3.return_value.Table.return_value = mock_table
+        mock_table = shared_registry_ctx.table
+        mock_table.scan.return_value = _LIST_ALL_SCAN
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = shared_registry_ctx.registry
         
         result = registry.list_all_agents(active_only=False)
         
         assert result['success'] is True
-        assert result['total_count'] == 2
-        assert len(result['agents']) == 2
+        assert (result['total_count'], len(result['agents'])) == (2, 2)
     
-    @patch('boto3.resource')
-    def test_list_all_agents_active_only(self, mock_boto3):
+    def test_list_all_agents_active_only(self, shared_registry_ctx):
         """Test listing only active agents."""
-        mock_table = Mock()
-        mock_table.scan.return_value = {
-            'Items': [
-                {
-                    'agent_id': 'agent-1',
-                    'name': 'Agent 1',
-                    'status': 'active'
-                }
-            ]
-        }
-        mock_boto3.return_value.Table.return_value = mock_table
+        mock_table = shared_registry_ctx.table
+        mock_table.scan.return_value = _LIST_ACTIVE_SCAN
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = shared_registry_ctx.registry
         
         result = registry.list_all_agents(active_only=True)
         
         assert result['success'] is True
-        assert result['total_count'] == 1
-        assert len(result['agents']) == 1
+        assert (result['total_count'], len(result['agents'])) == (1, 1)
     
-    @patch('boto3.resource')
-    def test_update_agent_success(self, mock_boto3):
-        """Test successful agent update."""
-        mock_table = Mock()
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        updates = {
-            'name': 'Updated Agent',
-            'description': 'Updated description'
-        }
-        
-        result = registry.update_agent("test-agent-001", updates)
+    @pytest.mark.parametrize("call,method,check", _OPERATION_SUCCESS_CASES)
+    def test_operation_success(self, registry_ctx, call, method, check):
+        """Test registry write operations that succeed."""
+        result = call(registry_ctx.registry)
         
         assert result['success'] is True
         assert "successfully" in result['message']
         
-        # Verify DynamoDB update_item was called
-        mock_table.update_item.assert_called_once()
-        call_args = mock_table.update_item.call_args[1]
+        # Verify the DynamoDB write targeted the agent
+        table_method = getattr(registry_ctx.table, method)
+        assert table_method.call_count == 1
+        call_args = table_method.call_args.kwargs
         assert call_args['Key'] == {'agent_id': 'test-agent-001'}
-        assert 'UpdateExpression' in call_args
+        assert check(call_args)
     
-    @patch('boto3.resource')
-    def test_update_agent_not_found(self, mock_boto3):
-        """Test agent update when agent doesn't exist."""
-        from botocore.exceptions import ClientError
-        
-        mock_table = Mock()
-        mock_table.update_item.side_effect = ClientError(
-            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 
-            'UpdateItem'
-        )
-        mock_boto3.return_value.Table.return_value = mock_table
+    @pytest.mark.parametrize("method,error_code,operation,call,expected", _OPERATION_ERROR_CASES)
+    def test_operation_dynamodb_errors(self, registry_ctx, agent_card, method, error_code,
+                                       operation, call, expected):
+        """Test registry operations when DynamoDB returns an error."""
+        getattr(registry_ctx.table, method).side_effect = _client_error(error_code, operation)
         
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        result = registry.update_agent("non-existent-agent", {'name': 'New Name'})
+        result = call(registry_ctx.registry, agent_card)
         
         assert result['success'] is False
-        assert result['error'] == 'Agent not found'
-    
-    @patch('boto3.resource')
-    def test_deregister_agent_success(self, mock_boto3):
-        """Test successful agent deregistration."""
-        mock_table = Mock()
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        result = registry.deregister_agent("test-agent-001")
-        
-        assert result['success'] is True
-        assert "successfully" in result['message']
-        
-        # Verify DynamoDB delete_item was called
-        mock_table.delete_item.assert_called_once_with(Key={'agent_id': 'test-agent-001'})
+        assert result['error'].startswith(expected)
     
-    @patch('boto3.resource')
-    def test_update_agent_heartbeat(self, mock_boto3):
-        """Test agent heartbeat update."""
-        mock_table = Mock()
-        mock_boto3.return_value.Table.return_value = mock_table
-        
-        registry = AgentRegistry("test-table", "us-east-1")
-        
-        result = registry.update_agent_heartbeat("test-agent-001")
-        
-        assert result['success'] is True
-        assert "successfully" in result['message']
-        
-        # Verify DynamoDB update_item was called with last_seen update
-        mock_table.update_item.assert_called_once()
-        call_args = mock_table.update_item.call_args[1]
-        assert call_args['Key'] == {'agent_id': 'test-agent-001'}
-        assert ':last_seen' in call_args['ExpressionAttributeValues']
-    
-    @patch('boto3.resource')
-    def test_cleanup_inactive_agents(self, mock_boto3):
+    def test_cleanup_inactive_agents(self, registry_ctx):
         """Test cleanup of inactive agents."""
-        mock_table = Mock()
+        # Naive UTC, matching the last_seen strings the registry writes
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        mock_table = registry_ctx.table
         mock_table.scan.return_value = {
             'Items': [
                 {
                     'agent_id': 'inactive-agent-1',
-                    'last_seen': (datetime.utcnow() - timedelta(hours=2)).isoformat()
+                    'last_seen': (now - timedelta(hours=2)).isoformat()
                 },
                 {
                     'agent_id': 'inactive-agent-2',
-                    'last_seen': (datetime.utcnow() - timedelta(hours=3)).isoformat()
+                    'last_seen': (now - timedelta(hours=3)).isoformat()
                 }
             ]
         }
-        mock_boto3.return_value.Table.return_value = mock_table
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = registry_ctx.registry
         
         result = registry.cleanup_inactive_agents(timeout_minutes=30)
         
         assert result['success'] is True
-        assert result['total_inactive'] == 2
-        assert result['deleted_count'] == 2
+        assert (result['total_inactive'], result['deleted_count']) == (2, 2)
         
         # Verify delete_item was called for each inactive agent
         assert mock_table.delete_item.call_count == 2
     
-    @patch('boto3.resource')
-    def test_get_agent_statistics(self, mock_boto3):
+    def test_get_agent_statistics(self, shared_registry_ctx):
         """Test getting agent statistics."""
-        mock_table = Mock()
-        mock_table.scan.return_value = {
-            'Items': [
-                {
-                    'agent_id': 'agent-1',
-                    'name': 'Agent 1',
-                    'status': 'active',
-                    'capability_types': ['text_processing'],
-                    'location': 'us-east-1'
-                },
-                {
-                    'agent_id': 'agent-2',
-                    'name': 'Agent 2',
-                    'status': 'inactive',
-                    'capability_types': ['data_analysis'],
-                    'location': 'us-west-2'
-                }
-            ]
-        }
-        mock_boto3.return_value.Table.return_value = mock_table
+        mock_table = shared_registry_ctx.table
+        mock_table.scan.return_value = _STATISTICS_SCAN
         
-        registry = AgentRegistry("test-table", "us-east-1")
+        registry = shared_registry_ctx.registry
         
         result = registry.get_agent_statistics()
         
         assert result['success'] is True
         stats = result['statistics']
-        assert stats['total_agents'] == 2
-        assert stats['active_agents'] == 1
-        assert stats['inactive_agents'] == 1
+        assert (stats['total_agents'], stats['active_agents'], stats['inactive_agents']) == (2, 1, 1)
         assert 'text_processing' in stats['capability_distribution']
         assert 'data_analysis' in stats['capability_distribution']
         assert 'us-east-1' in stats['location_distribution']